@@ -116,6 +116,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2 is used for new passwords; existing PBKDF2 hashes keep working
+# and are upgraded to Argon2 the next time the user logs in.
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/#using-argon2-with-django
+
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -146,6 +156,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "drf_orjson_renderer.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 
@@ -165,6 +179,13 @@ CELERY_BROKER_URL = "redis://" + REDIS_HOST + ":" + REDIS_PORT + "/0"
 CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 3600}
 CELERY_RESULT_BACKEND = "redis://" + REDIS_HOST + ":" + REDIS_PORT + "/0"
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://" + REDIS_HOST + ":" + REDIS_PORT + "/1",
+    }
+}
+
 
 CELERY_BEAT_SCHEDULE = {
     "reading_time_statistic": {
@@ -184,3 +205,6 @@ DEFAULT_FROM_EMAIL = "myapp"
 
 
 FRONTEND_URL = "http://localhost:3000"
+
+# Seconds during which repeated activation or reset requests send no new email
+EMAIL_RESEND_TIMEOUT = 120
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-14 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="readingsession",
+            index=models.Index(
+                fields=["user", "book", "-id"], name="books_readi_user_id_e20db7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="readingsession",
+            index=models.Index(
+                fields=["user", "stop_reading"], name="books_readi_user_id_4b8666_idx"
+            ),
+        ),
+    ]
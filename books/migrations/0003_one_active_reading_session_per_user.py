@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-14 05:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def stop_duplicate_active_sessions(apps, schema_editor):
+    """
+    Stops all but the latest active session of each user, so the constraint
+    can be added on databases where concurrent starts left several active.
+    """
+    ReadingSession = apps.get_model("books", "ReadingSession")
+    active_sessions = ReadingSession.objects.filter(stop_reading__isnull=True)
+    latest_ids = active_sessions.values("user_id").annotate(latest_id=Max("id"))
+    active_sessions.exclude(id__in=[row["latest_id"] for row in latest_ids]).update(
+        stop_reading=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_reading_session_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(stop_duplicate_active_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="readingsession",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stop_reading__isnull", True)),
+                fields=("user",),
+                name="one_active_reading_session_per_user",
+            ),
+        ),
+    ]
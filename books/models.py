@@ -66,5 +66,19 @@ class ReadingSession(models.Model):
     start_reading = models.DateTimeField(blank=True, null=True)
     stop_reading = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "book", "-id"]),
+            models.Index(fields=["user", "stop_reading"]),
+        ]
+        constraints = [
+            # Starting a session stops the user's other ones, so at most one is active
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(stop_reading__isnull=True),
+                name="one_active_reading_session_per_user",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user} reading {self.book.title} from {self.start_reading} to {self.stop_reading}"
@@ -1,64 +1,51 @@
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import serializers
 
 from books.models import Comment, LikeComment, Category, Book, ReadingSession
+from utils.serializers import CachedFieldsModelSerializer
 
 
-class ListCommentSerializer(serializers.ListSerializer):
-    """
-    Filters out comments that are replies.
-    Only the root-level comments (where parent=None) are returned.
-    """
-
-    def to_representation(self, data):
-        data = data.filter(parent=None)
-        return super().to_representation(data)
-
-
-class ReplySerializer(serializers.ModelSerializer):
+class ReplySerializer(CachedFieldsModelSerializer):
     """
     Serializer for a reply to a comment, showing the user, body, and number of likes.
     """
 
-    likes = serializers.SerializerMethodField()
+    likes = serializers.IntegerField(source="likes_count", read_only=True)
 
     class Meta:
         model = Comment
         fields = ["user", "body", "likes"]
 
-    def get_likes(self, obj):
-        return LikeComment.objects.filter(comment=obj).count()
-
 
-class CommentDetailSerializer(serializers.ModelSerializer):
+class CommentDetailSerializer(CachedFieldsModelSerializer):
     """
     Serializer for detailed comment representation, including its replies and likes.
+    Expects the comment and its prefetched replies to be annotated with likes_count,
+    as CommentViewSet does.
     """
 
     replies = serializers.SerializerMethodField()
-    likes = serializers.SerializerMethodField()
+    likes = serializers.IntegerField(source="likes_count", read_only=True)
 
     class Meta:
         model = Comment
         fields = ["id", "user", "book", "body", "parent", "replies", "likes"]
 
-    def get_likes(self, obj):
-        return LikeComment.objects.filter(comment=obj).count()
-
     def get_replies(self, obj):
-        if obj.replies.exists():
-            queryset = obj.replies.all()
-            return ReplySerializer(queryset, many=True).data
+        # Replies are prefetched by the view, so evaluating them hits the cache
+        replies = obj.replies.all()
+        if replies:
+            return ReplySerializer(replies, many=True).data
         else:
             return None
 
 
-class CommentsSerializer(serializers.ModelSerializer):
+class CommentsSerializer(CachedFieldsModelSerializer):
     """
-    Serializer for listing comments, with their replies.
-    Uses a custom list serializer to filter root-level comments.
+    Serializer for listing root-level comments, with their replies.
     """
 
     replies = serializers.SerializerMethodField()
@@ -66,17 +53,17 @@ class CommentsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ["user", "book", "body", "replies"]
-        list_serializer_class = ListCommentSerializer
 
     def get_replies(self, obj):
-        if obj.replies.exists():
-            queryset = obj.replies.all()
-            return ReplySerializer(queryset, many=True).data
+        # Replies are prefetched by the view, so evaluating them hits the cache
+        replies = obj.replies.all()
+        if replies:
+            return ReplySerializer(replies, many=True).data
         else:
             return None
 
 
-class CreateCommentSerializer(serializers.ModelSerializer):
+class CreateCommentSerializer(CachedFieldsModelSerializer):
     """
     Creates a new comment.
     """
@@ -104,7 +91,7 @@ class CreateCommentSerializer(serializers.ModelSerializer):
         return Comment.objects.create(user=user, **validated_data)
 
 
-class Category(serializers.ModelSerializer):
+class CategorySerializer(CachedFieldsModelSerializer):
     """
     Represents a book category.
     """
@@ -114,18 +101,22 @@ class Category(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class BooksSerializer(serializers.ModelSerializer):
+class BooksSerializer(CachedFieldsModelSerializer):
     """
     Serializer for listing books, including their categories.
     Categories are represented by their name.
     """
 
+    # Only describes the field for the schema and OPTIONS,
+    # to_representation renders the names itself
     categories = serializers.SlugRelatedField(
         slug_field="name", many=True, read_only=True
     )
 
     class Meta:
         model = Book
+        # to_representation builds the output from this list, a field that is
+        # not a plain book attribute needs its own case there
         fields = [
             "id",
             "title",
@@ -135,13 +126,29 @@ class BooksSerializer(serializers.ModelSerializer):
             "short_description",
         ]
 
+    def to_representation(self, instance):
+        """
+        Reads the flat fields directly from the book instead of going through
+        field-by-field attribute resolution, which dominates long book lists.
+        Categories are expected to be prefetched.
+        """
+        data = {}
+        for field in self.Meta.fields:
+            if field == "categories":
+                data[field] = [category.name for category in instance.categories.all()]
+            else:
+                data[field] = getattr(instance, field)
+        return data
+
 
-class BookDetailSerializer(serializers.ModelSerializer):
+class BookDetailSerializer(CachedFieldsModelSerializer):
     """
     Serializer for detailed book representation, including last reading session and categories.
     """
 
-    last_reading = serializers.SerializerMethodField()
+    last_reading = serializers.DateTimeField(
+        source="last_reading_ts", read_only=True, allow_null=True
+    )
     categories = serializers.SlugRelatedField(
         slug_field="name", many=True, read_only=True
     )
@@ -160,24 +167,8 @@ class BookDetailSerializer(serializers.ModelSerializer):
             "last_reading",
         ]
 
-    def get_last_reading(self, obj):
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return None
-        last_reading = (
-            obj.reading_sessions.filter(
-                user=self.context.get("request").user, stop_reading__isnull=False
-            )
-            .order_by("-stop_reading")
-            .first()
-        )
-        if last_reading:
-            return last_reading.stop_reading
-        else:
-            return None
-
 
-class ReadingSessionSerializer(serializers.ModelSerializer):
+class ReadingSessionSerializer(CachedFieldsModelSerializer):
     """
     Serializer for representing a reading session.
     """
@@ -188,13 +179,16 @@ class ReadingSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ["user", "book"]
 
 
-class StartReadingSerializer(serializers.ModelSerializer):
+class StartReadingSerializer(CachedFieldsModelSerializer):
     """
     Serializer for starting a new reading session.
 
     Validation:
         - Ensures there is no active reading session for the same book.
         - Automatically sets the start_reading field to the current time.
+    Must be validated and saved inside a transaction, as active sessions are
+    locked with select_for_update(). When there is no active session to lock,
+    concurrent starts are caught by the unique constraint on active sessions.
     """
 
     class Meta:
@@ -206,27 +200,37 @@ class StartReadingSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         book = self.context.get("book")
 
-        active_session = ReadingSession.objects.filter(
-            user=user, stop_reading__isnull=True
+        # Lock the active sessions so concurrent requests cannot both pass the check
+        active_sessions = list(
+            ReadingSession.objects.select_for_update().filter(
+                user=user, stop_reading__isnull=True
+            )
         )
-        if active_session.exists():
-            if active_session.filter(book=book):
-                raise ValidationError(
-                    {"detail": "Active reading session already exists"}
-                )
+        if any(session.book_id == book.id for session in active_sessions):
+            raise ValidationError({"detail": "Active reading session already exists"})
 
-            active_session.update(stop_reading=timezone.now())
+        if active_sessions:
+            ReadingSession.objects.filter(
+                id__in=[session.id for session in active_sessions]
+            ).update(stop_reading=timezone.now())
         return attrs
 
     def create(self, validated_data):
         user = self.context.get("request").user
         book = self.context.get("book")
-        return ReadingSession.objects.create(
-            user=user, book=book, start_reading=timezone.now()
-        )
+        try:
+            with transaction.atomic():
+                return ReadingSession.objects.create(
+                    user=user, book=book, start_reading=timezone.now()
+                )
+        except IntegrityError:
+            # Raised from save(), where DRF does not convert Django's ValidationError
+            raise serializers.ValidationError(
+                {"detail": "Active reading session already exists"}
+            )
 
 
-class StopReadingSerializer(serializers.ModelSerializer):
+class StopReadingSerializer(CachedFieldsModelSerializer):
     """
     Serializer for stopping the active reading session.
 
@@ -246,12 +250,22 @@ class StopReadingSerializer(serializers.ModelSerializer):
         return attrs
 
     def update(self, instance, validated_data):
-        instance.stop_reading = timezone.now()
-        instance.save()
+        """
+        Sets the stop time with one UPDATE that only matches the session while
+        it is still active, so concurrent stops cannot both succeed.
+        """
+        stop_reading = timezone.now()
+        updated = ReadingSession.objects.filter(
+            pk=instance.pk, stop_reading__isnull=True
+        ).update(stop_reading=stop_reading)
+        if not updated:
+            # Raised from save(), where DRF does not convert Django's ValidationError
+            raise serializers.ValidationError({"detail": "Session is not active"})
+        instance.stop_reading = stop_reading
         return instance
 
 
-class LikeCreateSerializer(serializers.ModelSerializer):
+class LikeCreateSerializer(CachedFieldsModelSerializer):
     """
     Serializer for liking a comment.
     Ensures that a user can only like a comment once.
@@ -265,8 +279,7 @@ class LikeCreateSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         user = self.context.get("request").user
         comment = self.context.get("comment")
-        like = comment.likes.filter(user=user)
-        if like.exists():
+        if comment.likes.filter(user=user).exists():
             raise ValidationError({"detail": "Like already exists"})
         return attrs
 
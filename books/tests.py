@@ -1,126 +1,117 @@
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
 from django.urls import reverse
-from rest_framework import status
+from rest_framework import serializers, status
 from books.models import ReadingSession, Comment, LikeComment
+from books.serializers import StartReadingSerializer, StopReadingSerializer
 from django.utils import timezone
 
-from utils.test_utils import get_jwt_for_user, get_auth_headers
+from utils.test_utils import create_test_corpus, get_jwt_for_user, get_auth_headers
 
 User = get_user_model()
 
+BOOK_LIST_URL = reverse("book-list")
+COMMENT_LIST_URL = reverse("comment-list")
+BOOK_DETAIL_URL = reverse("book-detail", kwargs={"pk": 1})
+BOOK_STATISTIC_URL = reverse("book-statistic", kwargs={"pk": 1})
+BOOK_START_READING_URL = reverse("book-start-reading", kwargs={"pk": 1})
+BOOK_STOP_READING_URL = reverse("book-stop-reading", kwargs={"pk": 1})
+
+EXPECTED_BOOK_LIST_FIELDS = frozenset(
+    ["id", "title", "author", "published", "categories", "short_description"]
+)
+EXPECTED_BOOK_DETAIL_FIELDS = EXPECTED_BOOK_LIST_FIELDS | {
+    "full_description",
+    "text",
+    "last_reading",
+}
+EXPECTED_COMMENT_LIST_FIELDS = frozenset(["user", "book", "body", "replies"])
+
 
 class BookAndCommentTest(APITestCase):
-    # TODO RESOLVE ISSUE REGARDING FIXTURE
-    fixtures = ["fixture.json"]
+    @classmethod
+    def setUpTestData(cls):
+        """Set up the test case by creating test data and authentication headers."""
+        create_test_corpus()
+        cls.user = User.objects.first()
+        cls.auth_headers = get_auth_headers(get_jwt_for_user(cls.user))
 
     def setUp(self):
-        """Set up the test case by creating a user and getting authentication headers."""
-        self.user = User.objects.first()
-        self.auth_headers = get_auth_headers(get_jwt_for_user(self.user))
+        """Set up a client that sends the authentication headers with every request."""
+        self.auth_client = APIClient()
+        self.auth_client.credentials(**self.auth_headers)
 
     def test_book_list_unauthorized(self):
         """Test retrieving the book list without authentication."""
-        url = reverse("book-list")
+        url = BOOK_LIST_URL
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNotNone(response.data)
-        expected_fields = [
-            "id",
-            "title",
-            "author",
-            "published",
-            "categories",
-            "short_description",
-        ]
 
         # Check that all expected fields are present no additional fields are included
         for book in response.data:
-            self.assertSetEqual(set(book.keys()), set(expected_fields))
+            self.assertSetEqual(set(book.keys()), EXPECTED_BOOK_LIST_FIELDS)
 
     def test_book_list_authorized(self):
         """Test retrieving the book list with authentication."""
-        url = reverse("book-list")
-        response = self.client.get(url, **self.auth_headers)
+        url = BOOK_LIST_URL
+        response = self.auth_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNotNone(response.data)
-        expected_fields = [
-            "id",
-            "title",
-            "author",
-            "published",
-            "categories",
-            "short_description",
-        ]
 
         # Check that all expected fields are present no additional fields are included
         for book in response.data:
-            self.assertSetEqual(set(book.keys()), set(expected_fields))
+            self.assertSetEqual(set(book.keys()), EXPECTED_BOOK_LIST_FIELDS)
 
     def test_book_detail_unauthorized(self):
         """Test retrieving book details without authentication."""
-        url = reverse("book-detail", kwargs={"pk": 1})
+        url = BOOK_DETAIL_URL
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        expected_fields = [
-            "id",
-            "title",
-            "author",
-            "published",
-            "categories",
-            "short_description",
-            "full_description",
-            "text",
-            "last_reading",
-        ]
+
         # Checks that last_reading field is None for unauthorized user
         self.assertIsNone(response.data["last_reading"])
 
         # Check that all expected fields are present no additional fields are included
-        self.assertSetEqual(set(response.data.keys()), set(expected_fields))
+        self.assertSetEqual(set(response.data.keys()), EXPECTED_BOOK_DETAIL_FIELDS)
 
     def test_book_detail_authorized(self):
         """Test retrieving book details with authentication."""
-        url = reverse("book-detail", kwargs={"pk": 1})
-        response = self.client.get(url, **self.auth_headers)
+        url = BOOK_DETAIL_URL
+        response = self.auth_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        expected_fields = [
-            "id",
-            "title",
-            "author",
-            "published",
-            "categories",
-            "short_description",
-            "full_description",
-            "text",
-            "last_reading",
-        ]
+
         # Check that all expected fields are present no additional fields are included
-        self.assertSetEqual(set(response.data.keys()), set(expected_fields))
+        self.assertSetEqual(set(response.data.keys()), EXPECTED_BOOK_DETAIL_FIELDS)
 
     def test_book_statistic_unauthorized(self):
         """Test retrieving book statistics without authentication."""
-        url = reverse("book-statistic", kwargs={"pk": 1})
+        url = BOOK_STATISTIC_URL
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_book_statistic_authorized(self):
         """Test retrieving book statistics with authentication."""
-        url = reverse("book-statistic", kwargs={"pk": 1})
-        response = self.client.get(url, **self.auth_headers)
+        url = BOOK_STATISTIC_URL
+        response = self.auth_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("total_reading_seconds", response.data)
 
     def test_start_reading_unauthorized(self):
         """Test starting a reading session without authentication."""
-        url = reverse("book-start-reading", kwargs={"pk": 1})
+        url = BOOK_START_READING_URL
         response = self.client.post(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_start_reading_authorized(self):
         """Test starting a reading session with authentication."""
-        url = reverse("book-start-reading", kwargs={"pk": 1})
-        response = self.client.post(url, **self.auth_headers)
+        url = BOOK_START_READING_URL
+        response = self.auth_client.post(url)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("start_reading", response.data)
         self.assertIsNone(response.data["stop_reading"])
@@ -133,8 +124,8 @@ class BookAndCommentTest(APITestCase):
             stop_reading=None,
             user_id=self.user.id,
         )
-        url = reverse("book-start-reading", kwargs={"pk": 1})
-        response = self.client.post(url, **self.auth_headers)
+        url = BOOK_START_READING_URL
+        response = self.auth_client.post(url)
         previous_reading_session.refresh_from_db()
 
         # Assert that the response is successful and the previous session is updated correctly.
@@ -152,15 +143,36 @@ class BookAndCommentTest(APITestCase):
             user_id=self.user.id,
         )
 
-        url = reverse("book-start-reading", kwargs={"pk": 1})
-        response = self.client.post(url, **self.auth_headers)
+        url = BOOK_START_READING_URL
+        response = self.auth_client.post(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Active reading session already exists", response.data["detail"])
 
+    def test_start_reading_session_started_concurrently(self):
+        """
+        Test starting a session while another request starts one after validation.
+        Verifies that the unique constraint turns the losing insert into a 400.
+        """
+        validate = StartReadingSerializer.validate
+
+        def validate_then_start(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            ReadingSession.objects.create(
+                book_id=1, start_reading=timezone.now(), user_id=self.user.id
+            )
+            return attrs
+
+        with patch.object(StartReadingSerializer, "validate", validate_then_start):
+            response = self.auth_client.post(BOOK_START_READING_URL)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["detail"], "Active reading session already exists"
+        )
+
     def test_start_reading_invalid_book_id(self):
         """Test starting a reading session with an invalid book ID."""
         url = reverse("book-start-reading", kwargs={"pk": 111111})
-        response = self.client.post(url, **self.auth_headers)
+        response = self.auth_client.post(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_stop_reading_authorized(self):
@@ -171,8 +183,8 @@ class BookAndCommentTest(APITestCase):
             stop_reading=None,
             user_id=self.user.id,
         )
-        url = reverse("book-stop-reading", kwargs={"pk": 1})
-        response = self.client.put(url, **self.auth_headers)
+        url = BOOK_STOP_READING_URL
+        response = self.auth_client.put(url)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIsNotNone(response.data["stop_reading"])
 
@@ -182,21 +194,46 @@ class BookAndCommentTest(APITestCase):
 
     def test_stop_reading_unauthorized(self):
         """Test stopping a reading session without authentication."""
-        url = reverse("book-stop-reading", kwargs={"pk": 1})
+        url = BOOK_STOP_READING_URL
         response = self.client.put(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_stop_reading_session_not_active(self):
         """Test stopping a reading session that is not active."""
-        url = reverse("book-stop-reading", kwargs={"pk": 1})
-        response = self.client.put(url, **self.auth_headers)
+        url = BOOK_STOP_READING_URL
+        response = self.auth_client.put(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Session is not active", response.data["detail"])
 
+    def test_stop_reading_session_stopped_concurrently(self):
+        """
+        Test stopping a session that another request stops after validation.
+        Verifies that the losing request gets a 400 instead of a server error.
+        """
+        session = ReadingSession.objects.create(
+            book_id=1,
+            start_reading=timezone.now(),
+            stop_reading=None,
+            user_id=self.user.id,
+        )
+        validate = StopReadingSerializer.validate
+
+        def validate_then_stop(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            ReadingSession.objects.filter(pk=session.pk).update(
+                stop_reading=timezone.now()
+            )
+            return attrs
+
+        with patch.object(StopReadingSerializer, "validate", validate_then_stop):
+            response = self.auth_client.put(BOOK_STOP_READING_URL)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Session is not active")
+
     def test_stop_reading_invalid_book_id(self):
         """Test stopping reading with an invalid book ID returns 404 Not Found."""
         url = reverse("book-stop-reading", kwargs={"pk": 1111111})
-        response = self.client.put(url, **self.auth_headers)
+        response = self.auth_client.put(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     ############
@@ -204,56 +241,50 @@ class BookAndCommentTest(APITestCase):
     def test_comments_list_unauthorized(self):
         """Test that the comments list is accessible without authentication
         and that the response contains the expected fields."""
-        url = reverse("comment-list")
+        url = COMMENT_LIST_URL
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        expected_fields = ["user", "book", "body", "replies"]
 
         # Check that all expected fields are present no additional fields are included
         for comment in response.data:
-            self.assertSetEqual(set(comment.keys()), set(expected_fields))
+            self.assertSetEqual(set(comment.keys()), EXPECTED_COMMENT_LIST_FIELDS)
 
     def test_comments_list_authorized(self):
         """Test that the comments list is accessible with authentication
         and that the response contains the expected fields."""
-        url = reverse("comment-list")
-        response = self.client.get(url, self.auth_headers)
+        url = COMMENT_LIST_URL
+        response = self.auth_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        expected_fields = ["user", "book", "body", "replies"]
 
         # Check that all expected fields are present no additional fields are included
         for comment in response.data:
-            self.assertSetEqual(set(comment.keys()), set(expected_fields))
+            self.assertSetEqual(set(comment.keys()), EXPECTED_COMMENT_LIST_FIELDS)
 
     def test_create_comment_unauthorized(self):
         """Test that creating a comment without authentication returns 401 Unauthorized."""
-        url = reverse("comment-list")
+        url = COMMENT_LIST_URL
         response = self.client.post(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_create_comment_authorized(self):
         """Test that an authenticated user can create a comment successfully."""
-        url = reverse("comment-list")
-        response = self.client.post(
-            url, data={"body": "commenttest", "book": 1}, **self.auth_headers
-        )
+        url = COMMENT_LIST_URL
+        response = self.auth_client.post(url, data={"body": "commenttest", "book": 1})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
     def test_create_comment_empty_body(self):
         """Test that creating a comment with an empty body returns 400 Bad Request
         with an appropriate error message."""
-        url = reverse("comment-list")
-        response = self.client.post(
-            url, data={"body": "", "book": 1}, **self.auth_headers
-        )
+        url = COMMENT_LIST_URL
+        response = self.auth_client.post(url, data={"body": "", "book": 1})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("This field may not be blank.", response.data["body"])
 
     def test_create_comment_invalid_book(self):
         """Test that creating a comment with an invalid book ID returns 400 Bad Request."""
-        url = reverse("comment-list")
-        response = self.client.post(
-            url, data={"body": "commnettest", "book": 11111111111}, **self.auth_headers
+        url = COMMENT_LIST_URL
+        response = self.auth_client.post(
+            url, data={"body": "commnettest", "book": 11111111111}
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn(
@@ -262,28 +293,26 @@ class BookAndCommentTest(APITestCase):
 
     def test_create_reply_authorized(self):
         """Test that an authenticated user can create a reply to an existing comment successfully."""
-        url = reverse("comment-list")
+        url = COMMENT_LIST_URL
         existing_comment = Comment.objects.first()
-        response = self.client.post(
+        response = self.auth_client.post(
             url,
             data={
                 "body": "replytest",
-                "book": existing_comment.book.id,
+                "book": existing_comment.book_id,
                 "parent": existing_comment.id,
             },
-            **self.auth_headers
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
     def test_create_reply_invalid_book(self):
         """Test that creating a reply to a comment with a different book ID returns
         400 Bad Request with an appropriate error message."""
-        url = reverse("comment-list")
+        url = COMMENT_LIST_URL
         existing_comment = Comment.objects.first()
-        response = self.client.post(
+        response = self.auth_client.post(
             url,
             data={"body": "replytest", "book": 2, "parent": existing_comment.id},
-            **self.auth_headers
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn(
@@ -301,16 +330,15 @@ class BookAndCommentTest(APITestCase):
         """Test that an authenticated user can delete their own comment successfully."""
         comment = Comment.objects.filter(user=self.user).first()
         url = reverse("comment-detail", kwargs={"pk": comment.id})
-        response = self.client.delete(url, **self.auth_headers)
+        response = self.auth_client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
     def test_delete_comment_authorized_not_owner(self):
         """Test that an authenticated user cannot delete a comment that they do not own,
         returning 403 Forbidden."""
-        another_user = User.objects.get(id=2)
-        comment = Comment.objects.filter(user=another_user).first()
+        comment = Comment.objects.filter(user_id=2).first()
         url = reverse("comment-detail", kwargs={"pk": comment.id})
-        response = self.client.delete(url, **self.auth_headers)
+        response = self.auth_client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_update_comment_unauthorized(self):
@@ -319,20 +347,18 @@ class BookAndCommentTest(APITestCase):
         url = reverse("comment-detail", kwargs={"pk": comment.id})
         response = self.client.put(
             url,
-            data={"body": "testcomment", "book": comment.book.id, "parent": comment.id},
+            data={"body": "testcomment", "book": comment.book_id, "parent": comment.id},
         )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_update_comment_authorized_not_owner(self):
         """Test that an authenticated user cannot update a comment that they do not own,
         returning 403 Forbidden."""
-        another_user = User.objects.get(id=2)
-        comment = Comment.objects.filter(user=another_user).first()
+        comment = Comment.objects.filter(user_id=2).first()
         url = reverse("comment-detail", kwargs={"pk": comment.id})
-        response = self.client.put(
+        response = self.auth_client.put(
             url,
-            data={"body": "testcomment", "book": comment.book.id, "parent": comment.id},
-            **self.auth_headers
+            data={"body": "testcomment", "book": comment.book_id, "parent": comment.id},
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
@@ -347,7 +373,7 @@ class BookAndCommentTest(APITestCase):
         """Test that an authenticated user can upvote a comment successfully."""
         comment = Comment.objects.filter(likes__isnull=True).first()
         url = reverse("comment-upvote", kwargs={"pk": comment.id})
-        response = self.client.post(url, **self.auth_headers)
+        response = self.auth_client.post(url)
         like = comment.likes.filter(user=self.user, comment=comment)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIsNotNone(like)
@@ -358,7 +384,7 @@ class BookAndCommentTest(APITestCase):
         comment = Comment.objects.filter(likes__isnull=True).first()
         LikeComment.objects.create(user=self.user, comment=comment)
         url = reverse("comment-upvote", kwargs={"pk": comment.id})
-        response = self.client.post(url, **self.auth_headers)
+        response = self.auth_client.post(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Like already exists", response.data["detail"])
 
@@ -375,7 +401,7 @@ class BookAndCommentTest(APITestCase):
         comment = Comment.objects.filter(likes__isnull=True).first()
         LikeComment.objects.create(user=self.user, comment=comment)
         url = reverse("comment-downvote", kwargs={"pk": comment.id})
-        response = self.client.delete(url, **self.auth_headers)
+        response = self.auth_client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
     def test_downvote_comment_authorized_like_not_exist(self):
@@ -383,6 +409,99 @@ class BookAndCommentTest(APITestCase):
         404 Not Found with an appropriate error message."""
         comment = Comment.objects.filter(likes__isnull=True).first()
         url = reverse("comment-downvote", kwargs={"pk": comment.id})
-        response = self.client.delete(url, **self.auth_headers)
+        response = self.auth_client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("Like does not exist", response.data["detail"])
+
+    def test_downvote_comment_non_numeric_pk(self):
+        """Test that downvoting with a non-numeric comment id returns
+        404 Not Found instead of a server error."""
+        url = reverse("comment-downvote", kwargs={"pk": "abc"})
+        response = self.auth_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn("Like does not exist", response.data["detail"])
+
+    def test_comment_detail_likes_count(self):
+        """Test that the comment detail returns like counts for it and its replies."""
+        comment = Comment.objects.get(id=1)
+        reply = comment.replies.first()
+        LikeComment.objects.create(user=self.user, comment=comment)
+        LikeComment.objects.create(user_id=2, comment=comment)
+        LikeComment.objects.create(user=self.user, comment=reply)
+        url = reverse("comment-detail", kwargs={"pk": comment.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["likes"], 2)
+        self.assertEqual(response.data["replies"][0]["likes"], 1)
+
+    def test_comments_list_only_root_comments(self):
+        """Test that replies are only listed nested under their parent."""
+        url = COMMENT_LIST_URL
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(response.data), Comment.objects.filter(parent__isnull=True).count()
+        )
+
+    def test_comments_list_does_not_count_root_likes(self):
+        """Test that listing comments only counts the likes of their replies."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(COMMENT_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(LikeComment._meta.db_table, queries[0]["sql"])
+
+    def test_book_detail_last_reading(self):
+        """Test that last_reading is the end of the user's latest finished session."""
+        last_session = (
+            ReadingSession.objects.filter(
+                user=self.user, book_id=1, stop_reading__isnull=False
+            )
+            .order_by("-stop_reading")
+            .first()
+        )
+        url = BOOK_DETAIL_URL
+        response = self.auth_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["last_reading"],
+            serializers.DateTimeField().to_representation(last_session.stop_reading),
+        )
+
+    def test_book_list_prefetches_categories(self):
+        """Test that book categories are fetched in one query for the whole list."""
+        url = BOOK_LIST_URL
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_book_list_categories(self):
+        """Test that listed books include the names of their categories."""
+        response = self.client.get(BOOK_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        book = next(book for book in response.data if book["id"] == 1)
+        self.assertCountEqual(book["categories"], ["Non-Fiction", "Science"])
+
+    def test_book_statistic_total_seconds(self):
+        """Test that book statistics sum the user's reading sessions in seconds."""
+        now = timezone.now()
+        ReadingSession.objects.create(
+            book_id=1,
+            start_reading=now - timedelta(minutes=10),
+            stop_reading=now,
+            user_id=self.user.id,
+        )
+        response = self.auth_client.get(BOOK_STATISTIC_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 322 seconds from the test data plus the 10 minute session
+        self.assertEqual(response.data["total_reading_seconds"], 322 + 600)
+
+    def test_downvote_comment_keeps_other_users_likes(self):
+        """Test that downvoting only removes the current user's like."""
+        comment = Comment.objects.filter(likes__isnull=True).first()
+        LikeComment.objects.create(user=self.user, comment=comment)
+        LikeComment.objects.create(user_id=2, comment=comment)
+        url = reverse("comment-downvote", kwargs={"pk": comment.id})
+        response = self.auth_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(comment.likes.filter(user=self.user).exists())
+        self.assertTrue(comment.likes.filter(user_id=2).exists())
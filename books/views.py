@@ -1,13 +1,24 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
-from django.db.models import Sum, F
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Extract
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from books.models import Book, ReadingSession, Comment
+from books.models import Book, ReadingSession, Comment, LikeComment
 from books.permissions import IsOwnerOrReadOnly
 from books.serializers import (
     BooksSerializer,
@@ -29,24 +40,55 @@ class BookViewSet(ReadOnlyModelViewSet):
     """
 
     queryset = Book.objects.all()
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    permission_classes_by_action = {
+        "statistic": [IsAuthenticated],
+        "start_reading": [IsAuthenticated],
+        "stop_reading": [IsAuthenticated],
+    }
+    serializer_classes_by_action = {
+        "list": BooksSerializer,
+        "retrieve": BookDetailSerializer,
+        "start_reading": StartReadingSerializer,
+        "stop_reading": StopReadingSerializer,
+    }
+
+    def get_queryset(self):
+        """
+        Prefetches the categories of listed books in a single query and annotates
+        the book detail with the user's last finished reading session,
+        so it is fetched in the same query as the book.
+        The list skips the text and full description, which it does not show,
+        and reading session actions only need the id of the book.
+        """
+        queryset = Book.objects.all()
+        if self.action in ["list", "retrieve"]:
+            queryset = queryset.prefetch_related("categories")
+        if self.action == "list":
+            queryset = queryset.defer("text", "full_description")
+        elif self.action in ["statistic", "start_reading", "stop_reading"]:
+            queryset = queryset.only("id")
+        if self.action == "retrieve" and self.request.user.is_authenticated:
+            last_reading = (
+                ReadingSession.objects.filter(
+                    book=OuterRef("pk"),
+                    user=self.request.user,
+                    stop_reading__isnull=False,
+                )
+                .order_by("-stop_reading")
+                .values("stop_reading")[:1]
+            )
+            queryset = queryset.annotate(last_reading_ts=Subquery(last_reading))
+        return queryset
 
     def get_serializer_class(self):
-        if self.action == "list":
-            return BooksSerializer
-        elif self.action == "retrieve":
-            return BookDetailSerializer
-        elif self.action == "start_reading":
-            return StartReadingSerializer
-        elif self.action == "stop_reading":
-            return StopReadingSerializer
+        return self.serializer_classes_by_action.get(self.action)
 
     def get_permissions(self):
-        if self.action in ["statistic", "start_reading", "stop_reading"]:
-            return [IsAuthenticated()]
-        elif self.action in ["list", "retrieve"]:
-            return [IsAuthenticatedOrReadOnly()]
-        else:
-            return [IsAuthenticatedOrReadOnly()]
+        permission_classes = self.permission_classes_by_action.get(
+            self.action, self.permission_classes
+        )
+        return [permission() for permission in permission_classes]
 
     @action(detail=True, methods=["get"])
     def statistic(self, request, *args, **kwargs):
@@ -56,14 +98,15 @@ class BookViewSet(ReadOnlyModelViewSet):
         """
 
         book = self.get_object()
-        total_reading_time = ReadingSession.objects.filter(
+        duration = ExpressionWrapper(
+            F("stop_reading") - F("start_reading"), output_field=DurationField()
+        )
+        # The database sums the durations directly in seconds
+        total_reading_seconds = ReadingSession.objects.filter(
             user=request.user, book=book
-        ).aggregate(duration=Sum(F("stop_reading") - F("start_reading")))["duration"]
+        ).aggregate(seconds=Sum(Extract(duration, "epoch")))["seconds"]
 
-        total_reading_seconds = (
-            total_reading_time.total_seconds() if total_reading_time else 0
-        )
-        return Response({"total_reading_seconds": int(total_reading_seconds)})
+        return Response({"total_reading_seconds": int(total_reading_seconds or 0)})
 
     @action(detail=True, methods=["post"])
     def start_reading(self, request, *args, **kwargs):
@@ -77,8 +120,9 @@ class BookViewSet(ReadOnlyModelViewSet):
         serializer = self.get_serializer(
             data=request.data, context={"request": request, "book": book}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -91,9 +135,11 @@ class BookViewSet(ReadOnlyModelViewSet):
 
         """
         book = self.get_object()
-        last_session = ReadingSession.objects.filter(
-            user=request.user, book=book
-        ).last()
+        last_session = (
+            ReadingSession.objects.filter(user=request.user, book=book)
+            .order_by("-id")
+            .first()
+        )
         serializer = self.get_serializer(data=request.data, instance=last_session)
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -110,24 +156,50 @@ class CommentViewSet(ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["book_id"]
     http_method_names = ["get", "post", "head", "put", "delete"]
-
-    def get_serializer_class(self):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    permission_classes_by_action = {
+        "update": [IsOwnerOrReadOnly],
+        "destroy": [IsOwnerOrReadOnly],
+        "upvote": [IsAuthenticated],
+    }
+    serializer_classes_by_action = {
+        "list": CommentsSerializer,
+        "retrieve": CommentDetailSerializer,
+        "create": CreateCommentSerializer,
+        "update": CreateCommentSerializer,
+        "partial_update": CreateCommentSerializer,
+        "upvote": LikeCreateSerializer,
+    }
+
+    def get_queryset(self):
+        """
+        Annotates the replies of listed and retrieved comments with the number
+        of likes, so like counts are computed in a single query instead of one
+        per comment. The comment itself is only annotated on retrieve, the list
+        serializer does not render its likes.
+        The list only contains root-level comments (where parent=None).
+        Upvoting only needs the id of the comment.
+        """
+        queryset = Comment.objects.all()
+        if self.action in ["list", "retrieve"]:
+            replies = Comment.objects.annotate(likes_count=Count("likes"))
+            queryset = queryset.prefetch_related(Prefetch("replies", queryset=replies))
         if self.action == "retrieve":
-            return CommentDetailSerializer
-        elif self.action in ["create", "update", "partial_update"]:
-            return CreateCommentSerializer
-        elif self.action == "upvote":
-            return LikeCreateSerializer
+            queryset = queryset.annotate(likes_count=Count("likes"))
         elif self.action == "list":
-            return CommentsSerializer
+            queryset = queryset.filter(parent__isnull=True)
+        elif self.action == "upvote":
+            queryset = queryset.only("id")
+        return queryset
+
+    def get_serializer_class(self):
+        return self.serializer_classes_by_action.get(self.action)
 
     def get_permissions(self):
-        if self.action in ["update", "destroy"]:
-            return [IsOwnerOrReadOnly()]
-        elif self.action == "upvote":
-            return [IsAuthenticated()]
-        else:
-            return [IsAuthenticatedOrReadOnly()]
+        permission_classes = self.permission_classes_by_action.get(
+            self.action, self.permission_classes
+        )
+        return [permission() for permission in permission_classes]
 
     @action(detail=True, methods=["post"])
     def upvote(self, request, *args, **kwargs):
@@ -147,11 +219,16 @@ class CommentViewSet(ModelViewSet):
         """
         Removes a user's upvote from a comment if it exists.
         If the upvote does not exist, raises a NotFound error.
+        The like is deleted directly by comment id, without fetching the comment.
         """
-        comment = self.get_object()
-        like = comment.likes.filter(user=request.user).first()
-        if like:
-            like.delete()
+        try:
+            deleted, _ = LikeComment.objects.filter(
+                comment_id=self.kwargs["pk"], user=request.user
+            ).delete()
+        except (TypeError, ValueError):
+            # The router accepts any pk, a non-numeric one matches no like
+            deleted = 0
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             raise NotFound({"detail": "Like does not exist"})
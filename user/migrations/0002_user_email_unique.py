@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Stops the migration with the conflicting users listed if several accounts
+    share an email, since the unique index below cannot be built over them.
+    Which account keeps the address has to be decided by an operator.
+    """
+    User = apps.get_model("auth", "User")
+    duplicate_emails = (
+        User.objects.exclude(email="")
+        .values("email")
+        .annotate(users=Count("id"))
+        .filter(users__gt=1)
+        .values_list("email", flat=True)
+    )
+    conflicts = {}
+    for user_id, email in User.objects.filter(
+        email__in=list(duplicate_emails)
+    ).values_list("id", "email"):
+        conflicts.setdefault(email, []).append(user_id)
+    if conflicts:
+        details = "; ".join(
+            f"{email}: user ids {', '.join(map(str, sorted(user_ids)))}"
+            for email, user_ids in sorted(conflicts.items())
+        )
+        raise RuntimeError(
+            "Cannot add the unique email index, these emails belong to several "
+            f"users: {details}. Change or clear the email of all but one user "
+            "of each group (e.g. in the admin), then run the migration again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        # Signup relies on this index to reject duplicate emails,
+        # accounts created without an email are left out of it.
+        migrations.RunSQL(
+            sql=(
+                "CREATE UNIQUE INDEX user_email_unique "
+                "ON auth_user (email) WHERE email <> ''"
+            ),
+            reverse_sql="DROP INDEX user_email_unique",
+        ),
+    ]
@@ -1,18 +1,18 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
-from django.utils.encoding import force_bytes
+from django.db import IntegrityError, transaction
 from django.utils.http import urlsafe_base64_decode
 from rest_framework import serializers
 from django.contrib.auth.tokens import default_token_generator
-from rest_framework.validators import UniqueValidator
 
 from user.models import Profile
+from utils.serializers import CachedFieldsModelSerializer
 
 User = get_user_model()
 
 
-class ListUserSerializer(serializers.ModelSerializer):
+class ListUserSerializer(CachedFieldsModelSerializer):
     """
     Serializes the 'username' and 'email' fields of the User model.
     """
@@ -22,7 +22,7 @@ class ListUserSerializer(serializers.ModelSerializer):
         fields = ["username", "email"]
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(CachedFieldsModelSerializer):
     """
     Serializes the total reading time for the last 7 and 30 days.
     """
@@ -32,16 +32,14 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = ["total_reading_7days", "total_reading_30days"]
 
 
-class CreateUserSerializer(serializers.ModelSerializer):
+class CreateUserSerializer(CachedFieldsModelSerializer):
     """
     Serializer for creating a new user.
     - Handles user creation, ensuring email uniqueness.
     - Serializes 'username', 'password', and 'email' fields.
     """
 
-    email = serializers.EmailField(
-        required=True, validators=[UniqueValidator(queryset=User.objects.all())]
-    )
+    email = serializers.EmailField(required=True)
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -57,12 +55,25 @@ class CreateUserSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        return User.objects.create_user(
-            username=validated_data["username"],
-            password=validated_data["password"],
-            email=validated_data["email"],
-            is_active=False,
-        )
+        """
+        Creates an inactive user.
+        Email uniqueness is enforced by a unique index instead of a lookup
+        before the insert.
+        """
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    username=validated_data["username"],
+                    password=validated_data["password"],
+                    email=validated_data["email"],
+                    is_active=False,
+                )
+        except IntegrityError:
+            if User.objects.filter(email=validated_data["email"]).exists():
+                raise serializers.ValidationError(
+                    {"email": ["This field must be unique."]}
+                )
+            raise
 
 
 class UserActivateSerializer(serializers.Serializer):
@@ -86,9 +97,12 @@ class UserActivateSerializer(serializers.Serializer):
         token = attrs.get("token")
         try:
             # Decode the base64-encoded UID
-            uid = force_bytes(urlsafe_base64_decode(uidb64))
-            user = User.objects.get(id=uid)
-        except (TypeError, ValueError, User.DoesNotExist):
+            uid = urlsafe_base64_decode(uidb64).decode()
+            # Only the columns read here and by the token generator
+            user = User.objects.only(
+                "id", "is_active", "password", "last_login", "email"
+            ).get(pk=uid)
+        except (TypeError, ValueError, UnicodeDecodeError, User.DoesNotExist):
             raise serializers.ValidationError({"detail": "Invalid activation link."})
 
         if user.is_active:
@@ -106,7 +120,7 @@ class UserActivateSerializer(serializers.Serializer):
     def save(self, **kwargs):
         user = self.validated_data["user"]
         user.is_active = True
-        user.save()
+        user.save(update_fields=["is_active"])
 
 
 class ResendActivationEmailSerializer(serializers.Serializer):
@@ -146,18 +160,23 @@ class ResetPasswordSerializer(serializers.Serializer):
         token = attrs.get("token")
         new_password = attrs.get("new_password")
 
-        validate_password(new_password)
         try:
             # Decode the base64-encoded UID
-            uid = force_bytes(urlsafe_base64_decode(uidb64))
-            user = User.objects.get(id=uid)
-        except (TypeError, ValueError, User.DoesNotExist):
+            uid = urlsafe_base64_decode(uidb64).decode()
+            # Only the columns read here and by the token generator
+            user = User.objects.only("id", "password", "last_login", "email").get(
+                pk=uid
+            )
+        except (TypeError, ValueError, UnicodeDecodeError, User.DoesNotExist):
             raise serializers.ValidationError("Invalid reset link.")
 
         # Check if the token is valid for the user
         if not default_token_generator.check_token(user, token):
             raise serializers.ValidationError("Invalid or expired token.")
 
+        # The password validators are cheap compared to hashing the new
+        # password, so weak passwords are rejected before check_password.
+        validate_password(new_password)
         if check_password(new_password, user.password):
             raise serializers.ValidationError(
                 "New password cannot be the same as the old password."
@@ -170,7 +189,7 @@ class ResetPasswordSerializer(serializers.Serializer):
         user = self.validated_data["user"]
         new_password = self.validated_data.get("new_password")
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=["password"])
 
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -191,13 +210,15 @@ class ChangePasswordSerializer(serializers.Serializer):
         new_password = attrs.get("new_password")
         user = self.context.get("request").user
 
-        if not check_password(current_password, user.password):
-            raise serializers.ValidationError({"detail": "Incorrect password"})
-        if check_password(new_password, user.password):
+        # Once the current password is verified, comparing the raw passwords
+        # is equivalent to hashing the new one, so no second hash is needed.
+        if new_password == current_password:
             raise serializers.ValidationError(
                 {"detail": "New password cannot be the same as the old password."}
             )
         validate_password(new_password)
+        if not check_password(current_password, user.password):
+            raise serializers.ValidationError({"detail": "Incorrect password"})
 
         attrs["user"] = user
         return attrs
@@ -206,4 +227,4 @@ class ChangePasswordSerializer(serializers.Serializer):
         user = self.validated_data["user"]
         new_password = self.validated_data["new_password"]
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=["password"])
@@ -1,25 +1,20 @@
 from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from user.models import Profile
-from user.utils import send_activation_email
+from user.tasks import send_activation_email_task
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_user_profile(created, **kwargs):
+def set_up_new_user(sender, instance, created, raw=False, **kwargs):
     """
-    Signal receiver that creates a user profile when a new user is created.
+    Signal receiver that creates a user profile and queues an activation email
+    when a new user is created.
+    A new user has no profile yet, so there is no need to look it up first.
+    The email is queued once the user is committed, so the task can load it.
     """
-    instance = kwargs["instance"]
-    if created and not hasattr(instance, "profile"):
+    if created and not raw:
         Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def send_activation_email_(sender, instance, created, **kwargs):
-    """
-    Signal receiver that sends an activation email when a new user is created.
-    """
-    if created:
-        send_activation_email(instance)
+        transaction.on_commit(lambda: send_activation_email_task.delay(instance.pk))
@@ -1,14 +1,48 @@
 from datetime import timedelta
 from celery import shared_task
 from django.contrib.auth import get_user_model
-from django.db.models import F, Sum
+from django.core.mail import get_connection
+from django.db.models import (
+    DurationField,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Cast, Coalesce, Extract, Floor
 from django.utils import timezone
 
 from books.models import ReadingSession
 from user.models import Profile
+from user.utils import send_activation_email, send_reset_password_email
 
 User = get_user_model()
 
+# Columns read by the emails and by the token generator they embed
+EMAIL_USER_FIELDS = ["id", "username", "email", "password", "last_login"]
+
+
+def _reading_seconds_since(since):
+    """
+    Whole seconds the profile's user spent reading in sessions stopped since the
+    given time, as a subquery correlated with the profile being updated.
+    """
+    duration = ExpressionWrapper(
+        F("stop_reading") - F("start_reading"), output_field=DurationField()
+    )
+    total_reading = (
+        ReadingSession.objects.filter(
+            user_id=OuterRef("user_id"), stop_reading__gte=since
+        )
+        .values("user_id")
+        .annotate(total=Sum(Extract(duration, "epoch")))
+        .values("total")
+    )
+    # Users without sessions in the window get 0
+    return Coalesce(Cast(Floor(Subquery(total_reading)), IntegerField()), 0)
+
 
 @shared_task
 def reading_time_statistic():
@@ -21,28 +55,39 @@ def reading_time_statistic():
     seven_days_ago = timezone.now() - timedelta(days=7)
     thirty_days_ago = timezone.now() - timedelta(days=30)
 
-    profiles = Profile.objects.all()
+    # A single UPDATE computes both totals in the database for every profile,
+    # so no rows are loaded into Python or sent back.
+    Profile.objects.update(
+        total_reading_7days=_reading_seconds_since(seven_days_ago),
+        total_reading_30days=_reading_seconds_since(thirty_days_ago),
+    )
 
-    for profile in profiles:
-        # Calculate total reading time for the last 7 days
-        total_reading_7days = ReadingSession.objects.filter(
-            user=profile.user, stop_reading__gte=seven_days_ago
-        ).aggregate(duration=Sum(F("stop_reading") - F("start_reading")))["duration"]
-        # Convert the total reading time to seconds, default to 0 if None
-        total_reading_7days_seconds = (
-            total_reading_7days.total_seconds() if total_reading_7days else 0
-        )
 
-        # Calculate total reading time for the last 30 days
-        total_reading_30days = ReadingSession.objects.filter(
-            user=profile.user, stop_reading__gte=thirty_days_ago
-        ).aggregate(duration=Sum(F("stop_reading") - F("start_reading")))["duration"]
-        # Convert the total reading time to seconds, default to 0 if None
-        total_reading_30days_seconds = (
-            total_reading_30days.total_seconds() if total_reading_30days else 0
-        )
+@shared_task
+def send_activation_email_task(user_id):
+    """
+    Sends the account activation email outside the request that created the user.
+    """
+    user = User.objects.only(*EMAIL_USER_FIELDS).get(pk=user_id)
+    send_activation_email(user)
 
-        Profile.objects.filter(id=profile.id).update(
-            total_reading_7days=int(total_reading_7days_seconds),
-            total_reading_30days=int(total_reading_30days_seconds),
-        )
+
+@shared_task
+def send_reset_password_email_task(user_id):
+    """
+    Sends the password reset email outside the request that asked for it.
+    """
+    user = User.objects.only(*EMAIL_USER_FIELDS).get(pk=user_id)
+    send_reset_password_email(user)
+
+
+@shared_task
+def send_activation_emails_bulk(user_ids):
+    """
+    Sends the account activation email to several users, e.g. after a bulk
+    import, over a single mail server connection.
+    """
+    users = User.objects.filter(pk__in=user_ids).only(*EMAIL_USER_FIELDS)
+    with get_connection() as connection:
+        for user in users.iterator():
+            send_activation_email(user, connection=connection)
@@ -1,33 +1,42 @@
 from datetime import timedelta
-from unittest import TestCase
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import check_password
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from kombu.exceptions import OperationalError
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
 from books.models import ReadingSession, Book
 from user.models import Profile
-from user.tasks import reading_time_statistic
-from utils.test_utils import get_jwt_for_user, get_auth_headers
+from user.tasks import reading_time_statistic, send_activation_emails_bulk
+from utils.test_utils import (
+    TEST_CACHES,
+    TEST_PASSWORD_HASHERS,
+    get_jwt_for_user,
+    get_auth_headers,
+)
 
 User = get_user_model()
 
 
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
 class UserSignUpTest(APITestCase):
     """Tests for user signup and associated functionality."""
 
-    @patch("user.signals.send_activation_email")
+    @patch("user.signals.send_activation_email_task")
     def test_user_registration_sends_activation_email(self, mock_send_mail):
         """
         Test that a successful user registration sends an activation email.
-        Mocks the `send_activation_email` function and verifies that it is called after registration.
+        Mocks the `send_activation_email_task` task and verifies that it is queued after registration.
         """
         url = reverse("signup")
         data = {
@@ -35,15 +44,16 @@ class UserSignUpTest(APITestCase):
             "password": "strongpassword123",
             "email": "test@gmail.com",
         }
-        response = self.client.post(url, data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("access_token", response.data)
         self.assertIn("refresh_token", response.data)
         user = User.objects.get(username="testuser")
         self.assertIsNotNone(user)
 
-        # Checks if the email was sent
-        mock_send_mail.assert_called_once_with(user)
+        # Checks if the email was queued
+        mock_send_mail.delay.assert_called_once_with(user.pk)
 
     def test_is_profile_created(self):
         """
@@ -64,15 +74,17 @@ class UserSignUpTest(APITestCase):
         self.assertIsNotNone(profile)
 
 
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
 class UserSignUpTestInvalidEmail(APITestCase):
     """Tests for invalid email cases during user registration."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="testuser", password="strongpassword123", email="test@gmail.com"
         )
 
-    @patch("user.signals.send_activation_email")
+    @patch("user.signals.send_activation_email_task")
     def test_registration_email_already_exists(self, mock_send_mail):
         """
         Test registration with an already existing email.
@@ -87,10 +99,10 @@ class UserSignUpTestInvalidEmail(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("This field must be unique.", response.data["email"])
-        # Checks if the email was not sent
-        mock_send_mail.assert_not_called()
+        # Checks if the email was not queued
+        mock_send_mail.delay.assert_not_called()
 
-    @patch("user.signals.send_activation_email")
+    @patch("user.signals.send_activation_email_task")
     def test_registration_invalid_email(self, mock_send_mail):
         url = reverse("signup")
         data = {
@@ -101,22 +113,27 @@ class UserSignUpTestInvalidEmail(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Enter a valid email address.", response.data["email"])
-        # Checks if the email was not sent
-        mock_send_mail.assert_not_called()
+        # Checks if the email was not queued
+        mock_send_mail.delay.assert_not_called()
 
 
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS, CACHES=TEST_CACHES)
 class UserActivationTest(APITestCase):
     """Tests for user account activation functionality."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="testuser",
             password="strongpassword123",
             email="test@gmail.com",
             is_active=False,
         )
-        self.uidb64 = urlsafe_base64_encode(force_bytes(self.user.pk))
-        self.token = default_token_generator.make_token(self.user)
+        cls.uidb64 = urlsafe_base64_encode(force_bytes(cls.user.pk))
+        cls.token = default_token_generator.make_token(cls.user)
+
+    def setUp(self):
+        cache.clear()
 
     def test_account_activation(self):
         """
@@ -124,9 +141,11 @@ class UserActivationTest(APITestCase):
         Verifies that the user is activated and receives a 200 OK response.
         """
         url = reverse("user-activate")
-        response = self.client.put(
-            url, data={"uidb64": self.uidb64, "token": self.token}
-        )
+        # One narrowed SELECT for the user and one UPDATE of is_active
+        with self.assertNumQueries(2):
+            response = self.client.put(
+                url, data={"uidb64": self.uidb64, "token": self.token}
+            )
         self.user.refresh_from_db()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(self.user.is_active)
@@ -146,18 +165,57 @@ class UserActivationTest(APITestCase):
         user = User.objects.get(id=uid)
         self.assertFalse(user.is_active)
 
-    @patch("user.views.send_activation_email")
+    def test_account_activation_undecodable_uid(self):
+        """
+        Test account activation with a uidb64 that is not valid UTF-8.
+        Verifies that the activation fails with a 400 BAD REQUEST response.
+        """
+        url = reverse("user-activate")
+        response = self.client.put(
+            url,
+            data={"uidb64": urlsafe_base64_encode(b"\xff"), "token": self.token},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Invalid activation link.", response.data["detail"])
+
+    @patch("user.views.send_activation_email_task")
     def test_resend_activation(self, mock_send_mail):
         """
         Test resending the activation email.
-        Mocks the `send_activation_email` function and verifies it is called when requested.
+        Mocks the `send_activation_email_task` task and verifies it is queued when requested.
         """
         url = reverse("user-resend-activation")
         response = self.client.post(url, data={"email": self.user.email})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        mock_send_mail.assert_called_once_with(self.user)
+        mock_send_mail.delay.assert_called_once_with(self.user.pk)
+
+    @patch("user.views.send_activation_email_task")
+    def test_resend_activation_repeated(self, mock_send_mail):
+        """
+        Test resending the activation email twice in a row.
+        Verifies that both requests succeed but only one email is queued.
+        """
+        url = reverse("user-resend-activation")
+        for _ in range(2):
+            response = self.client.post(url, data={"email": self.user.email})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_send_mail.delay.assert_called_once_with(self.user.pk)
 
-    @patch("user.views.send_activation_email")
+    @patch("user.views.send_activation_email_task")
+    def test_resend_activation_after_queue_failure(self, mock_send_mail):
+        """
+        Test resending the activation email after queuing it failed.
+        Verifies that the failed attempt does not block the retry.
+        """
+        mock_send_mail.delay.side_effect = [OperationalError("broker down"), None]
+        url = reverse("user-resend-activation")
+        with self.assertRaises(OperationalError):
+            self.client.post(url, data={"email": self.user.email})
+        response = self.client.post(url, data={"email": self.user.email})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_send_mail.delay.call_count, 2)
+
+    @patch("user.views.send_activation_email_task")
     def test_resend_activation_invalid_email(self, mock_send_mail):
         """
         Test resending activation email with an invalid email address.
@@ -166,18 +224,52 @@ class UserActivationTest(APITestCase):
         url = reverse("user-resend-activation")
         response = self.client.post(url, data={"email": "invalid_email"})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-        mock_send_mail.assert_not_called()
+        mock_send_mail.delay.assert_not_called()
+
 
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
+class ActivationEmailsBulkTest(APITestCase):
+    """Tests for sending activation emails to several users at once."""
 
+    def test_send_activation_emails_bulk(self):
+        """
+        Test that each listed user receives an activation email.
+        """
+        users = [
+            User.objects.create_user(
+                username=username,
+                password="strongpassword123",
+                email=username + "@gmail.com",
+                is_active=False,
+            )
+            for username in ["first", "second", "third"]
+        ]
+        # Deferred columns read while rendering the emails would add queries
+        with self.assertNumQueries(1):
+            send_activation_emails_bulk([user.pk for user in users[:2]])
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["first@gmail.com", "second@gmail.com"],
+        )
+
+
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS, CACHES=TEST_CACHES)
 class ChangeAndResetPasswordTest(APITestCase):
     """Tests for changing and resetting passwords."""
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        """Set up the test user and authentication headers for password tests."""
+        cls.user = User.objects.create_user(
             username="testuser", password="strongpassword123", email="test@gmail.com"
         )
-        """Set up authentication headers for password tests."""
-        self.auth_headers = get_auth_headers(get_jwt_for_user(self.user))
+        cls.auth_headers = get_auth_headers(get_jwt_for_user(cls.user))
+
+    def setUp(self):
+        """Set up a client that sends the authentication headers with every request."""
+        cache.clear()
+        self.auth_client = APIClient()
+        self.auth_client.credentials(**self.auth_headers)
 
     def test_change_password(self):
         """
@@ -185,13 +277,12 @@ class ChangeAndResetPasswordTest(APITestCase):
         Verifies that the password is changed successfully.
         """
         url = reverse("user-change-password")
-        response = self.client.put(
+        response = self.auth_client.put(
             url,
             data={
                 "current_password": "strongpassword123",
                 "new_password": "newpasswordtest",
             },
-            **self.auth_headers
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.user.refresh_from_db()
@@ -203,13 +294,12 @@ class ChangeAndResetPasswordTest(APITestCase):
         Verifies that the request fails with a 400 BAD REQUEST response.
         """
         url = reverse("user-change-password")
-        response = self.client.put(
+        response = self.auth_client.put(
             url,
             data={
                 "current_password": "incorectpass",
                 "new_password": "newpasswordtest",
             },
-            **self.auth_headers
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Incorrect password", response.data["detail"])
@@ -220,13 +310,12 @@ class ChangeAndResetPasswordTest(APITestCase):
         Verifies that the request fails with a 400 BAD REQUEST response.
         """
         url = reverse("user-change-password")
-        response = self.client.put(
+        response = self.auth_client.put(
             url,
             data={
                 "current_password": "strongpassword123",
                 "new_password": "strongpassword123",
             },
-            **self.auth_headers
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn(
@@ -234,7 +323,7 @@ class ChangeAndResetPasswordTest(APITestCase):
             response.data["detail"],
         )
 
-    @patch("user.views.send_reset_password_email")
+    @patch("user.views.send_reset_password_email_task")
     def test_request_reset_password(self, mock_send_mail):
         """
         Test requesting a password reset for an existing user.
@@ -245,9 +334,21 @@ class ChangeAndResetPasswordTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         user = User.objects.get(email="test@gmail.com")
         self.assertIsNotNone(user)
-        mock_send_mail.assert_called_once_with(user)
+        mock_send_mail.delay.assert_called_once_with(user.pk)
 
-    @patch("user.views.send_reset_password_email")
+    @patch("user.views.send_reset_password_email_task")
+    def test_request_reset_password_repeated(self, mock_send_mail):
+        """
+        Test requesting a password reset twice in a row.
+        Verifies that both requests succeed but only one email is queued.
+        """
+        url = reverse("user-request-reset-password")
+        for _ in range(2):
+            response = self.client.post(url, data={"email": self.user.email})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_send_mail.delay.assert_called_once_with(self.user.pk)
+
+    @patch("user.views.send_reset_password_email_task")
     def test_request_reset_password_invalid_email(self, mock_send_mail):
         """
         Test requesting a password reset for a non-existent user.
@@ -257,7 +358,7 @@ class ChangeAndResetPasswordTest(APITestCase):
         response = self.client.post(url, data={"email": "invalid@gmail.com"})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         # Assert that the email sending function was not called
-        mock_send_mail.assert_not_called()
+        mock_send_mail.delay.assert_not_called()
 
     def test_reset_password(self):
         """
@@ -280,19 +381,56 @@ class ChangeAndResetPasswordTest(APITestCase):
         self.assertTrue(check_password("strongnewpassword", self.user.password))
 
 
+class UserListTest(APITestCase):
+    """Tests for listing users."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                username=username,
+                password=make_password(None),
+                email=username + "@gmail.com",
+            )
+            for username in ["first", "second", "third"]
+        )
+
+    def test_user_list_single_query(self):
+        """
+        Test that listing users takes one query however many users there are.
+        """
+        url = reverse("user-list")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(user["username"] for user in response.data),
+            ["first", "second", "third"],
+        )
+
+
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
 class ProfileTest(APITestCase):
     """
     Test  fetching profile details for a user.
     """
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="testuser", password="strongpassword123", email="test@gmail.com"
         )
-        self.auth_headers = get_auth_headers(get_jwt_for_user(self.user))
-        self.user.profile.total_reading_7days = 600
-        self.user.profile.total_reading_30days = 1000
-        self.user.profile.save()
+        cls.auth_headers = get_auth_headers(get_jwt_for_user(cls.user))
+        cls.user.profile.total_reading_7days = 600
+        cls.user.profile.total_reading_30days = 1000
+        cls.user.profile.save(
+            update_fields=["total_reading_7days", "total_reading_30days"]
+        )
+
+    def setUp(self):
+        """Set up a client that sends the authentication headers with every request."""
+        self.auth_client = APIClient()
+        self.auth_client.credentials(**self.auth_headers)
 
     def test_profile_list_authorized(self):
         """
@@ -300,7 +438,9 @@ class ProfileTest(APITestCase):
         that the reading statistics are correctly returned.
         """
         url = reverse("user-profile", kwargs={"pk": self.user.id})
-        response = self.client.get(url, **self.auth_headers)
+        # One query authenticates the user, one fetches the user and profile
+        with self.assertNumQueries(2):
+            response = self.auth_client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["total_reading_7days"], 600)
         self.assertEqual(response.data["total_reading_30days"], 1000)
@@ -311,18 +451,20 @@ class ProfileTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
 class ReadingStatisticTest(TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
         Set up a test user and book. Create multiple reading sessions to simulate
         reading over different time periods (within 7 days, 30 days, and older than 30 days).
         """
-        self.user = User.objects.create_user(
-            username="testuser", password="strongpassword123", email="test@gmail.com"
+        # The password is never checked here, so an unusable one skips hashing
+        cls.user = User.objects.create(
+            username="testuser", password=make_password(None), email="test@gmail.com"
         )
-        self.auth_headers = get_auth_headers(get_jwt_for_user(self.user))
-        self.book = Book.objects.create(
+        cls.book = Book.objects.create(
             title="title",
             author="author",
             text="text",
@@ -332,23 +474,27 @@ class ReadingStatisticTest(TestCase):
         )
         # Create reading sessions within and outside the 7 and 30 day windows
         now = timezone.now()
-        self.reading_session_1 = ReadingSession.objects.create(
-            user=self.user,
-            book=self.book,
-            start_reading=now - timedelta(days=5, hours=1),
-            stop_reading=now - timedelta(days=5),
-        )
-        self.reading_session_2 = ReadingSession.objects.create(
-            user=self.user,
-            book=self.book,
-            start_reading=now - timedelta(days=15, hours=2),
-            stop_reading=now - timedelta(days=15),
-        )
-        self.reading_session_3 = ReadingSession.objects.create(
-            user=self.user,
-            book=self.book,
-            start_reading=now - timedelta(days=35, hours=3),
-            stop_reading=now - timedelta(days=35),
+        ReadingSession.objects.bulk_create(
+            [
+                ReadingSession(
+                    user=cls.user,
+                    book=cls.book,
+                    start_reading=now - timedelta(days=5, hours=1),
+                    stop_reading=now - timedelta(days=5),
+                ),
+                ReadingSession(
+                    user=cls.user,
+                    book=cls.book,
+                    start_reading=now - timedelta(days=15, hours=2),
+                    stop_reading=now - timedelta(days=15),
+                ),
+                ReadingSession(
+                    user=cls.user,
+                    book=cls.book,
+                    start_reading=now - timedelta(days=35, hours=3),
+                    stop_reading=now - timedelta(days=35),
+                ),
+            ]
         )
 
     def test_reading_time_statistic_authorized(self):
@@ -367,3 +513,37 @@ class ReadingStatisticTest(TestCase):
         self.assertEqual(
             self.user.profile.total_reading_30days, 10800
         )  # 3 hours in total
+
+    def test_reading_time_statistic_other_users(self):
+        """
+        Test that each profile only counts its own user's sessions, and that
+        totals left from an earlier run are reset when a user stops reading.
+        """
+        other_user = User.objects.create_user(
+            username="otheruser", password="strongpassword123", email="other@gmail.com"
+        )
+        now = timezone.now()
+        ReadingSession.objects.create(
+            user=other_user,
+            book=self.book,
+            start_reading=now - timedelta(days=2, minutes=30),
+            stop_reading=now - timedelta(days=2),
+        )
+        idle_user = User.objects.create_user(
+            username="idleuser", password="strongpassword123", email="idle@gmail.com"
+        )
+        Profile.objects.filter(user=idle_user).update(
+            total_reading_7days=600, total_reading_30days=1000
+        )
+
+        reading_time_statistic()
+
+        other_user.profile.refresh_from_db()
+        self.assertEqual(other_user.profile.total_reading_7days, 1800)
+        self.assertEqual(other_user.profile.total_reading_30days, 1800)
+        idle_user.profile.refresh_from_db()
+        self.assertEqual(idle_user.profile.total_reading_7days, 0)
+        self.assertEqual(idle_user.profile.total_reading_30days, 0)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_reading_7days, 3600)
+        self.assertEqual(self.user.profile.total_reading_30days, 10800)
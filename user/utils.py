@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 from django.core.mail import send_mail
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -13,15 +14,22 @@ def generate_token(user):
     return uidb64, token
 
 
-def send_activation_email(user):
+def send_activation_email(user, connection=None):
     """
     Sends an account activation email to a user with a unique activation link.
+    An open mail connection can be passed to send several emails over it.
     """
     uidb64, token = generate_token(user)
     activation_link = f"{settings.FRONTEND_URL}/activate?uidb64={uidb64}&token={token}"
     subject = "Activate Your Account"
     message = f"Hi {user.username},\n\nPlease activate your account by clicking the link below:\n{activation_link}"
-    send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
+    send_mail(
+        subject,
+        message,
+        settings.EMAIL_HOST_USER,
+        [user.email],
+        connection=connection,
+    )
 
 
 def send_reset_password_email(user):
@@ -35,3 +43,19 @@ def send_reset_password_email(user):
     subject = "Password Reset"
     message = f"Hi {user.username},\n\nPlease reset your password by clicking the link below:\n{reset_password_link}"
     send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
+
+
+def queue_email_once(kind, task, user_id):
+    """
+    Queues the email task for the user unless an email of the given kind was
+    queued for them in the last EMAIL_RESEND_TIMEOUT seconds.
+    If queuing fails, the claim is released so that a retry can send it.
+    """
+    key = f"{kind}_email:{user_id}"
+    if not cache.add(key, True, timeout=settings.EMAIL_RESEND_TIMEOUT):
+        return
+    try:
+        task.delay(user_id)
+    except Exception:
+        cache.delete(key)
+        raise
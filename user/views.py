@@ -23,7 +23,8 @@ from user.serializers import (
     ListUserSerializer,
     ProfileSerializer,
 )
-from user.utils import send_activation_email, send_reset_password_email
+from user.tasks import send_activation_email_task, send_reset_password_email_task
+from user.utils import queue_email_once
 
 
 User = get_user_model()
@@ -80,33 +81,44 @@ class UserViewSet(ModelViewSet):
 
     queryset = User.objects.all()
     http_method_names = ["get", "post", "head", "put"]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    permission_classes_by_action = {
+        "activate": [AllowAny],
+        "resend_activation": [AllowAny],
+        "request_reset_password": [AllowAny],
+        "reset_password": [AllowAny],
+        "change_password": [IsAuthenticated],
+        "profile": [IsAuthenticated],
+    }
+    serializer_class = ListUserSerializer
+    serializer_classes_by_action = {
+        "activate": UserActivateSerializer,
+        "resend_activation": ResendActivationEmailSerializer,
+        "reset_password": ResetPasswordSerializer,
+        "change_password": ChangePasswordSerializer,
+        "profile": ProfileSerializer,
+    }
+
+    def get_queryset(self):
+        """
+        Joins the profile when it is returned, so it is fetched with the user.
+        The list only loads the columns it shows.
+        """
+        queryset = User.objects.all()
+        if self.action == "profile":
+            queryset = queryset.select_related("profile")
+        elif self.action == "list":
+            queryset = queryset.only("id", "username", "email")
+        return queryset
 
     def get_permissions(self):
-        if self.action in [
-            "activate",
-            "resend_activation",
-            "request_reset_password",
-            "reset_password",
-        ]:
-            return [AllowAny()]
-        elif self.action in ["change_password", "profile"]:
-            return [IsAuthenticated()]
-        else:
-            return [IsAuthenticatedOrReadOnly()]
+        permission_classes = self.permission_classes_by_action.get(
+            self.action, self.permission_classes
+        )
+        return [permission() for permission in permission_classes]
 
     def get_serializer_class(self):
-        if self.action == "activate":
-            return UserActivateSerializer
-        elif self.action == "resend_activation":
-            return ResendActivationEmailSerializer
-        elif self.action == "reset_password":
-            return ResetPasswordSerializer
-        elif self.action == "change_password":
-            return ChangePasswordSerializer
-        elif self.action == "profile":
-            return ProfileSerializer
-        else:
-            return ListUserSerializer
+        return self.serializer_classes_by_action.get(self.action, self.serializer_class)
 
     @action(detail=False, methods=["put"], url_path="activate")
     def activate(self, request, *args, **kwargs):
@@ -124,26 +136,28 @@ class UserViewSet(ModelViewSet):
     def resend_activation(self, request, *args, **kwargs):
         """
         Retrieves the user by email.
-        Sends the activation email again.
+        Queues the activation email again.
         """
         email = request.data.get("email")
-        user = get_object_or_404(User, email=email)
+        # The task loads the user again, so only the state checked here is needed
+        user = get_object_or_404(User.objects.only("id", "is_active"), email=email)
         serializer = self.get_serializer(data=request.data, context={"user": user})
         serializer.is_valid(raise_exception=True)
 
-        send_activation_email(user)
+        # Repeated clicks within the resend window do not send another email
+        queue_email_once("activation", send_activation_email_task, user.pk)
         return Response(status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"], url_path="request_reset_password")
     def request_reset_password(self, request, *args, **kwargs):
         """
         Retrieves the user by email.
-        Sends the password reset email.
+        Queues the password reset email.
         """
         email = request.data.get("email")
-        user = get_object_or_404(User, email=email)
+        user = get_object_or_404(User.objects.only("id"), email=email)
 
-        send_reset_password_email(user)
+        queue_email_once("reset_password", send_reset_password_email_task, user.pk)
         return Response(status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["put"], url_path="reset_password")
@@ -0,0 +1,25 @@
+from copy import copy
+
+from rest_framework.serializers import ModelSerializer
+
+
+class CachedFieldsSerializerMixin:
+    """
+    Builds the fields of a ModelSerializer class once and returns shallow copies
+    of the cached fields, instead of deep-copying and introspecting the model
+    on every serializer instantiation.
+    """
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        if cls not in self._fields_cache:
+            self._fields_cache[cls] = super().get_fields()
+        return {name: copy(field) for name, field in self._fields_cache[cls].items()}
+
+
+class CachedFieldsModelSerializer(CachedFieldsSerializerMixin, ModelSerializer):
+    """
+    ModelSerializer whose fields are built once per serializer class.
+    """
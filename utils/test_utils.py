@@ -1,5 +1,24 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from books.models import Book, Category, Comment, ReadingSession
+from user.models import Profile
+
+User = get_user_model()
+
+# A fast hasher for tests, where password hashing only adds setup time.
+# Use it with override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS).
+TEST_PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# A per-process cache for tests, so they do not need Redis. Clear it in setUp.
+# Use it with override_settings(CACHES=TEST_CACHES).
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 
 def get_jwt_for_user(user):
     """
@@ -12,3 +31,140 @@ def get_jwt_for_user(user):
 def get_auth_headers(access_token):
     """Helper method to include the JWT token in the Authorization header."""
     return {"HTTP_AUTHORIZATION": f"Bearer {access_token}"}
+
+
+def create_test_corpus():
+    """
+    Creates the users, books, comments and reading sessions used by the API tests.
+    Rows are inserted with bulk_create and fixed primary keys, so tests can refer
+    to them by id without per-row saves or signals.
+    """
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(id=1, username="test", email="test@gmail.com", password=password),
+            User(id=2, username="test2", email="test2@gmail.com", password=password),
+            User(id=3, username="test3", email="test3@gmail.com", password=password),
+            User(id=4, username="test4", email="test4@gmail.com", password=password),
+            User(id=5, username="olena", email="olena@gmail.com", password=password),
+        ]
+    )
+    Profile.objects.bulk_create(
+        [
+            Profile(id=1, user_id=1, total_reading_7days=426, total_reading_30days=426),
+            Profile(id=2, user_id=2, total_reading_7days=140, total_reading_30days=140),
+            Profile(id=3, user_id=3),
+            Profile(id=4, user_id=4),
+            Profile(id=5, user_id=5),
+        ]
+    )
+
+    Category.objects.bulk_create(
+        [
+            Category(id=1, name="Non-Fiction"),
+            Category(id=2, name="Science"),
+            Category(id=3, name="Fiction"),
+            Category(id=4, name="History"),
+            Category(id=5, name="Fantasy"),
+        ]
+    )
+    Book.objects.bulk_create(
+        [
+            Book(
+                id=1,
+                title="book 1",
+                author="author 1",
+                text="text1",
+                published="1900",
+                short_description="short",
+                full_description="full",
+            ),
+            Book(
+                id=2,
+                title="book2",
+                author="author2",
+                text="text2",
+                published="2000",
+                short_description="short2",
+                full_description="full2",
+            ),
+            Book(
+                id=3,
+                title="book3",
+                author="author3",
+                text="text3",
+                published="1999",
+                short_description="short3",
+                full_description="full3",
+            ),
+            Book(
+                id=4,
+                title="book4",
+                author="author4",
+                text="text4",
+                published="1890",
+                short_description="short4",
+                full_description="full4",
+            ),
+            Book(
+                id=5,
+                title="book5",
+                author="author5",
+                text="text5",
+                published="1901",
+                short_description="short5",
+                full_description="full5",
+            ),
+        ]
+    )
+    book_categories = {1: [1, 2], 2: [1, 4], 3: [5], 4: [3, 4, 5], 5: []}
+    Book.categories.through.objects.bulk_create(
+        [
+            Book.categories.through(book_id=book_id, category_id=category_id)
+            for book_id, category_ids in book_categories.items()
+            for category_id in category_ids
+        ]
+    )
+
+    Comment.objects.bulk_create(
+        [
+            Comment(id=1, user_id=1, book_id=1, body="comment first"),
+            Comment(id=2, user_id=1, book_id=1, body="reply", parent_id=1),
+            Comment(id=3, user_id=1, book_id=2, body="comment2"),
+            Comment(id=4, user_id=2, book_id=2, body="comment2"),
+            Comment(id=5, user_id=2, book_id=2, body="wow"),
+            Comment(id=6, user_id=2, book_id=5, body="wow"),
+        ]
+    )
+    ReadingSession.objects.bulk_create(
+        [
+            ReadingSession(
+                id=1,
+                user_id=2,
+                book_id=1,
+                start_reading=datetime(2024, 9, 24, 17, 22, 21, tzinfo=timezone.utc),
+                stop_reading=datetime(2024, 9, 24, 17, 24, 41, tzinfo=timezone.utc),
+            ),
+            ReadingSession(
+                id=2,
+                user_id=1,
+                book_id=4,
+                start_reading=datetime(2024, 9, 25, 8, 41, 31, tzinfo=timezone.utc),
+                stop_reading=datetime(2024, 9, 25, 8, 43, 15, tzinfo=timezone.utc),
+            ),
+            ReadingSession(
+                id=3,
+                user_id=1,
+                book_id=1,
+                start_reading=datetime(2024, 9, 25, 8, 44, 9, tzinfo=timezone.utc),
+                stop_reading=datetime(2024, 9, 25, 8, 49, 31, tzinfo=timezone.utc),
+            ),
+        ]
+    )
+
+    # Explicit primary keys do not advance the sequences, so reset them
+    # the same way loaddata does.
+    models = [User, Profile, Category, Book, Comment, ReadingSession]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)